@@ -5,16 +5,25 @@ Generates .ics calendar files for prayer times using the official UAE AWQAF Pray
 """
 
 import argparse
+import atexit
 import hashlib
 import json
+import logging
 import os
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List, Tuple
+import random
+import time
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Any, Iterable, Iterator, Optional, List, Tuple
+from zoneinfo import ZoneInfo
 import calendar
 
-import pytz
+import orjson
 import requests
-from icalendar import Calendar, Event, Alarm
+from requests.adapters import HTTPAdapter
+from requests.utils import DEFAULT_ACCEPT_ENCODING
+
+logger = logging.getLogger(__name__)
 
 class PrayerConfig:
     """Configuration class for prayer times and calendar settings"""
@@ -30,10 +39,59 @@ class PrayerConfig:
     }
     PRAYER_DURATION = 10
     
+    # Per-prayer display strings, computed once from ADHAN_DURATIONS
+    PRAYERS = {
+        prayer: {
+            'title': prayer.title(),
+            'adhan_summary': f'{prayer.title()} Adhan till Iqamah',
+            'adhan_alarm': f'{prayer.title()} Adhan',
+            'prayer_summary': f'{prayer.title()} Prayer',
+            'prayer_alarm': f'{prayer.title()} Prayer in 5 minutes',
+            'adhan_duration': duration
+        }
+        for prayer, duration in ADHAN_DURATIONS.items()
+    }
+    
     # Calendar colors
     ADHAN_COLOR = "#008000"  # Green
     PRAYER_COLOR = "#ba1e55"  # Proton Calendar's Cerise
 
+# Built once and attached directly with tzinfo=
+_TZ = ZoneInfo(PrayerConfig.TIMEZONE)
+
+# Month lengths never change, so memoize lookups
+_monthrange = lru_cache(maxsize=256)(calendar.monthrange)
+
+# Prayers in calendar order
+_PRAYER_ORDER = ("fajr", "zuhr", "asr", "maghrib", "isha")
+
+# What differs between the two events created for each prayer, in output order.
+# 'summary' and 'alarm' name keys in PrayerConfig.PRAYERS; 'description' is literal
+# text placed between the prayer title and the city, e.g. "Fajr Adhan Time for Dubai".
+_EVENT_SPECS = {
+    'adhan': {
+        'color': PrayerConfig.ADHAN_COLOR,
+        'summary': 'adhan_summary',
+        'description': 'Adhan Time for',
+        'alarm': 'adhan_alarm',
+        'alarm_trigger': timedelta(minutes=0)
+    },
+    'prayer': {
+        'color': PrayerConfig.PRAYER_COLOR,
+        'summary': 'prayer_summary',
+        'description': 'Prayer Time for',
+        'alarm': 'prayer_alarm',
+        'alarm_trigger': timedelta(minutes=-5)
+    }
+}
+
+def _create_session() -> requests.Session:
+    """Create a pooled HTTP session so repeated AWQAF calls reuse connections"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=20)
+    session.mount('https://', adapter)
+    return session
+
 class TokenManager:
     """Manages the authentication token for AWQAF API"""
     TOKEN_FILE = "auth_token.json"
@@ -42,7 +100,17 @@ class TokenManager:
     REFRESH_URL = "https://mobileappapi.awqaf.gov.ae/APIS/v2/sso/ClientAuthorization?lang=ar"
     MAX_RETRIES = 3
     RETRY_DELAY = 1  # seconds
-    TIMEZONE = pytz.timezone('Asia/Dubai')
+    TIMEZONE = _TZ
+    
+    # Shared by AWQAFApi so token and prayer time calls reuse the same connections
+    _session = _create_session()
+    
+    # In-memory copy of the current token so repeated calls skip the file read.
+    # It is only reused while the token file's mtime is unchanged and before
+    # _cached_deadline (epoch seconds, five minutes ahead of the token expiry).
+    _cached_token: Optional[str] = None
+    _cached_mtime: Optional[float] = None
+    _cached_deadline: float = 0.0
     
     @classmethod
     def _load_config(cls) -> dict:
@@ -56,8 +124,8 @@ class TokenManager:
             Exception: If config file is missing or invalid
         """
         try:
-            with open(cls.CONFIG_FILE, 'r') as f:
-                config = json.load(f)
+            with open(cls.CONFIG_FILE, 'rb') as f:
+                config = orjson.loads(f.read())
                 
             required_fields = {'clientGuid', 'clientSecret'}
             if not all(field in config for field in required_fields):
@@ -69,11 +137,38 @@ class TokenManager:
                 f"Configuration file '{cls.CONFIG_FILE}' not found. "
                 "Please create it with your client credentials."
             )
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             raise Exception(f"Invalid JSON format in {cls.CONFIG_FILE}: {str(e)}")
         except KeyError as e:
             raise Exception(f"Invalid config file structure: {str(e)}")
     
+    @classmethod
+    def _parse_expiry(cls, value: Any) -> Optional[datetime]:
+        """Parse refreshTokenExpiryTime into a timezone-aware datetime, or None if invalid"""
+        try:
+            expiry = datetime.fromisoformat(str(value))
+        except (TypeError, ValueError):
+            return None
+        if expiry.tzinfo is None:
+            expiry = expiry.replace(tzinfo=cls.TIMEZONE)
+        return expiry
+    
+    @classmethod
+    def _cache_token(cls, token_data: dict, mtime: float) -> str:
+        """Remember the token, the token file's mtime and the token expiry"""
+        expiry = cls._parse_expiry(token_data['refreshTokenExpiryTime'])
+        cls._cached_token = token_data['clientAccessToken']
+        cls._cached_mtime = mtime
+        cls._cached_deadline = (expiry - timedelta(minutes=5)).timestamp() if expiry else 0.0
+        return cls._cached_token
+    
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def _read_token_file(path: str, mtime: float) -> dict:
+        """Read and parse the token file; the result is reused until its mtime changes"""
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    
     @classmethod
     def get_token(cls) -> str:
         """
@@ -86,36 +181,40 @@ class TokenManager:
             Exception: If token file is invalid or token refresh fails
         """
         try:
-            with open(cls.TOKEN_FILE, 'r') as f:
-                try:
-                    token_data = json.load(f)
-                except json.JSONDecodeError as e:
-                    return cls.refresh_token()
-                
-                # Validate token data structure
-                required_fields = {'clientAccessToken', 'clientRefreshToken', 'refreshTokenExpiryTime'}
-                if not all(field in token_data for field in required_fields):
-                    return cls.refresh_token()
-                
-                # If we have no expiry time or empty tokens, refresh
-                if (token_data['refreshTokenExpiryTime'] is None or 
-                    not token_data['clientAccessToken'] or 
-                    not token_data['clientRefreshToken']):
-                    return cls.refresh_token()
-                
-                return token_data['clientAccessToken']
+            mtime = os.stat(cls.TOKEN_FILE).st_mtime
+            
+            # Reuse the cached token while the file is unchanged and the token is comfortably within its expiry
+            if mtime == cls._cached_mtime and time.time() < cls._cached_deadline:
+                logger.debug("Using cached access token")
+                return cls._cached_token
+            
+            try:
+                token_data = cls._read_token_file(cls.TOKEN_FILE, mtime)
+                logger.debug("Read token data from %s", cls.TOKEN_FILE)
+            except orjson.JSONDecodeError as e:
+                return cls.refresh_token()
+            
+            # Validate token data structure
+            required_fields = {'clientAccessToken', 'clientRefreshToken', 'refreshTokenExpiryTime'}
+            if not all(field in token_data for field in required_fields):
+                return cls.refresh_token()
+            
+            # If we have no expiry time or empty tokens, refresh
+            if (token_data['refreshTokenExpiryTime'] is None or 
+                not token_data['clientAccessToken'] or 
+                not token_data['clientRefreshToken']):
+                return cls.refresh_token()
+            
+            return cls._cache_token(token_data, mtime)
                     
         except FileNotFoundError:
             return cls.refresh_token()
 
     @classmethod
-    def refresh_token(cls, retry_count: int = 0) -> str:
+    def refresh_token(cls) -> str:
         """
-        Refresh the access token using client credentials.
+        Refresh the access token using client credentials, retrying with exponential backoff.
         
-        Args:
-            retry_count (int): Current retry attempt number
-            
         Returns:
             str: New access token
             
@@ -136,35 +235,37 @@ class TokenManager:
             "clientSecret": config['clientSecret']
         }
         
-        try:
-            # First attempt with existing token
-            response = requests.post(cls.REFRESH_URL, headers=headers, json=data, timeout=10)
-            response.raise_for_status()
-            
-            response_data = response.json()
-            
-            if not response_data.get('isSuccess', False):
-                error_desc = response_data.get('errorDescription', 'Unknown error')
-                raise ValueError(f"Authorization failed: {error_desc}")
-            
-            token_data = {
-                'clientAccessToken': response_data['clientAccessToken'],
-                'clientRefreshToken': response_data['clientRefreshToken'],
-                'refreshTokenExpiryTime': response_data['refreshTokenExpiryTime']
-            }
-            
-            # Save new token data
-            with open(cls.TOKEN_FILE, 'w') as f:
-                json.dump(token_data, f, indent=4)
-            
-            return token_data['clientAccessToken']
-            
-        except (requests.exceptions.RequestException, ValueError) as e:
-            if retry_count < cls.MAX_RETRIES:
-                import time
-                time.sleep(cls.RETRY_DELAY * (retry_count + 1))
-                return cls.refresh_token(retry_count + 1)
-            raise Exception(f"Failed to refresh token after {cls.MAX_RETRIES} attempts: {str(e)}")
+        for attempt in range(cls.MAX_RETRIES + 1):
+            try:
+                logger.debug("Requesting a new access token (attempt %d)", attempt + 1)
+                response = cls._session.post(cls.REFRESH_URL, headers=headers, json=data, timeout=10)
+                response.raise_for_status()
+                
+                response_data = orjson.loads(response.content)
+                
+                if not response_data.get('isSuccess', False):
+                    error_desc = response_data.get('errorDescription', 'Unknown error')
+                    raise ValueError(f"Authorization failed: {error_desc}")
+                
+                token_data = {
+                    'clientAccessToken': response_data['clientAccessToken'],
+                    'clientRefreshToken': response_data['clientRefreshToken'],
+                    'refreshTokenExpiryTime': response_data['refreshTokenExpiryTime']
+                }
+                
+                # Save new token data
+                with open(cls.TOKEN_FILE, 'w') as f:
+                    json.dump(token_data, f, indent=4)
+                
+                # The file may be rewritten within the same mtime tick, so drop the parsed copy
+                cls._read_token_file.cache_clear()
+                return cls._cache_token(token_data, os.stat(cls.TOKEN_FILE).st_mtime)
+                
+            except (requests.exceptions.RequestException, ValueError) as e:
+                if attempt == cls.MAX_RETRIES:
+                    raise Exception(f"Failed to refresh token after {cls.MAX_RETRIES} attempts: {str(e)}")
+                # Exponential backoff with a little jitter so retries don't line up
+                time.sleep(cls.RETRY_DELAY * (2 ** attempt) + random.random() * 0.1)
 
 class AWQAFApi:
     """Handles interactions with the AWQAF Prayer Times API"""
@@ -172,6 +273,25 @@ class AWQAFApi:
     LOCATIONS_URL = "https://mobileappapi.awqaf.gov.ae/APIS/v2/prayer-time/EmiratesAndCities"
     LOCATIONS_CACHE_FILE = "locations_cache.json"
     
+    # Static browser headers sent with every AWQAF API request
+    HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:133.0) Gecko/20100101 Firefox/133.0',
+        'Accept': '*/*',
+        'Accept-Language': 'en-US,en;q=0.5',
+        # Only advertise encodings that can be decoded here (br/zstd need brotli/zstandard installed)
+        'Accept-Encoding': DEFAULT_ACCEPT_ENCODING,
+        'Origin': 'https://www.awqaf.gov.ae',
+        'DNT': '1',
+        'Connection': 'keep-alive',
+        'Referer': 'https://www.awqaf.gov.ae/',
+        'Sec-Fetch-Dest': 'empty',
+        'Sec-Fetch-Mode': 'cors',
+        'Sec-Fetch-Site': 'same-site',
+        'Sec-GPC': '1'
+    }
+    
+    _session = TokenManager._session
+    
     @classmethod
     def get_locations(cls) -> Dict[str, Any]:
         """
@@ -183,27 +303,13 @@ class AWQAFApi:
         try:
             # Try to read from cache first
             if os.path.exists(cls.LOCATIONS_CACHE_FILE):
-                with open(cls.LOCATIONS_CACHE_FILE, 'r') as f:
-                    return json.load(f)
+                with open(cls.LOCATIONS_CACHE_FILE, 'rb') as f:
+                    return orjson.loads(f.read())
         except Exception:
             pass  # If any error occurs reading cache, fetch from API
             
         # Prepare API request
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:133.0) Gecko/20100101 Firefox/133.0',
-            'Accept': '*/*',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate, br, zstd',
-            'Authorization': f'Bearer {TokenManager.get_token()}',
-            'Origin': 'https://www.awqaf.gov.ae',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Referer': 'https://www.awqaf.gov.ae/',
-            'Sec-Fetch-Dest': 'empty',
-            'Sec-Fetch-Mode': 'cors',
-            'Sec-Fetch-Site': 'same-site',
-            'Sec-GPC': '1'
-        }
+        headers = {**cls.HEADERS, 'Authorization': f'Bearer {TokenManager.get_token()}'}
         
         params = {
             'lang': 'ar',
@@ -212,15 +318,15 @@ class AWQAFApi:
         
         try:
             # First attempt with existing token
-            response = requests.get(cls.LOCATIONS_URL, headers=headers, params=params)
+            response = cls._session.get(cls.LOCATIONS_URL, headers=headers, params=params)
             
             # If unauthorized, try once more with a fresh token
             if response.status_code == 401:
                 headers['Authorization'] = f'Bearer {TokenManager.refresh_token()}'
-                response = requests.get(cls.LOCATIONS_URL, headers=headers, params=params)
+                response = cls._session.get(cls.LOCATIONS_URL, headers=headers, params=params)
                 
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
             
             # Cache the results
             with open(cls.LOCATIONS_CACHE_FILE, 'w') as f:
@@ -228,7 +334,7 @@ class AWQAFApi:
                 
             return data
         except Exception as e:
-            print(f"Error fetching locations: {str(e)}")
+            logger.error("Error fetching locations: %s", e)
             return {"emirates": [], "cities": []}
             
     @classmethod
@@ -265,29 +371,18 @@ class AWQAFApi:
         ]
     
     @staticmethod
-    def fetch_prayer_times(year: int, month: int, day: Optional[int], city: str) -> Dict[str, Any]:
+    def fetch_prayer_times(start_date: date, end_date: date, city: str) -> Dict[str, Any]:
         """
-        Fetch prayer times from AWQAF API
+        Fetch prayer times from AWQAF API for a date range in a single request
         Args:
-            year: Year to fetch prayer times for
-            month: Month to fetch prayer times for
-            day: Optional specific day to fetch prayer times for
+            start_date: First day to fetch prayer times for
+            end_date: Last day to fetch prayer times for (inclusive)
             city: City name
         Returns:
             Dictionary containing prayer times data
         """
-        # Format dates for API request
-        if day:
-            # If day is specified, fetch only that day
-            start_date = end_date = f"{year}-{month:02d}-{day:02d}"
-        else:
-            # Get first and last day of the month
-            _, last_day = calendar.monthrange(year, month)
-            start_date = f"{year}-{month:02d}-01"
-            end_date = f"{year}-{month:02d}-{last_day:02d}"
-        
-        # Prepare API request
-        url = f"{AWQAFApi.BASE_URL}/{start_date}/{end_date}"
+        # Prepare API request covering the whole range
+        url = f"{AWQAFApi.BASE_URL}/{start_date.isoformat()}/{end_date.isoformat()}"
         
         def make_request(use_refresh_token=False):
             if use_refresh_token:
@@ -295,22 +390,8 @@ class AWQAFApi:
             else:
                 token = TokenManager.get_token()
                 
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:133.0) Gecko/20100101 Firefox/133.0',
-                'Accept': '*/*',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Accept-Encoding': 'gzip, deflate, br, zstd',
-                'Authorization': f'Bearer {token}',
-                'Origin': 'https://www.awqaf.gov.ae',
-                'DNT': '1',
-                'Connection': 'keep-alive',
-                'Referer': 'https://www.awqaf.gov.ae/',
-                'Sec-Fetch-Dest': 'empty',
-                'Sec-Fetch-Mode': 'cors',
-                'Sec-Fetch-Site': 'same-site',
-                'Sec-GPC': '1'
-            }
-            return requests.get(url, headers=headers)
+            headers = {**AWQAFApi.HEADERS, 'Authorization': f'Bearer {token}'}
+            return AWQAFApi._session.get(url, headers=headers)
         
         try:
             # First attempt with existing token
@@ -321,55 +402,51 @@ class AWQAFApi:
                 response = make_request(use_refresh_token=True)
                 
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
             
             # Format the data
             formatted_data = {
                 "prayertimes": []
             }
             
-            # Process each day's prayer times
+            # Process each day's prayer times, stopping once every requested day is found
+            city_lower = city.lower()
+            remaining_dates = {
+                (start_date + timedelta(days=offset)).isoformat()
+                for offset in range((end_date - start_date).days + 1)
+            }
             for item in data.get('prayerData', []):
                 try:
                     # Check if this is for the requested city
-                    if item.get('areaNameEn', '').lower() != city.lower():
+                    if item.get('areaNameEn', '').lower() != city_lower:
                         continue
                     
                     # Get the date
-                    date = item.get('gDate', '').split('T')[0]  # Get just the date part
-                    if not date:
+                    date_str = item.get('gDate', '').split('T')[0]  # Get just the date part
+                    if not date_str:
                         continue
                     
                     # Extract prayer times
                     prayer_times = {}
-                    for prayer, api_field in [
-                        ('fajr', 'fajr'),
-                        ('zuhr', 'zuhr'),
-                        ('asr', 'asr'),
-                        ('maghrib', 'maghrib'),
-                        ('isha', 'isha')
-                    ]:
-                        time_str = item.get(api_field, '')
+                    for prayer in _PRAYER_ORDER:
+                        time_str = item.get(prayer, '')
                         if time_str:
-                            # Extract just the time part (HH:MM:SS) from the datetime string
-                            time_part = time_str.split('T')[1].split('.')[0]
-                            # Convert to 24-hour format
-                            try:
-                                time_obj = datetime.strptime(time_part, '%H:%M:%S')
-                                prayer_times[prayer] = time_obj.strftime('%H:%M')
-                            except ValueError:
-                                print(f"Warning: Could not parse time {time_part} for {prayer}")
-                                prayer_times[prayer] = ''
+                            # Keep just HH:MM from the 24-hour datetime string (e.g. 2025-01-01T05:42:00)
+                            prayer_times[prayer] = time_str.split('T', 1)[1][:5]
                         else:
                             prayer_times[prayer] = ''
                     
                     # Add prayer times
                     formatted_data["prayertimes"].append({
-                        "date": date,
+                        "date": date_str,
                         "timings": prayer_times
                     })
+                    # Duplicate rows for a date must not end the loop early
+                    remaining_dates.discard(date_str)
+                    if not remaining_dates:
+                        break
                 except Exception as e:
-                    print(f"Error processing prayer times for a day: {str(e)}")
+                    logger.warning("Error processing prayer times for a day: %s", e)
                     continue
             
             if not formatted_data["prayertimes"]:
@@ -380,90 +457,158 @@ class AWQAFApi:
         except requests.RequestException as e:
             raise Exception(f"Failed to fetch prayer times: {str(e)}")
 
+def _escape_text(value: str) -> str:
+    """Escape a TEXT property value (RFC 5545, section 3.3.11)"""
+    return (value.replace('\\', '\\\\')
+                 .replace(';', '\\;')
+                 .replace(',', '\\,')
+                 .replace('\n', '\\n'))
+
+def _fold_line(line: str) -> str:
+    """Fold a content line longer than 75 octets (RFC 5545, section 3.1)"""
+    if len(line.encode()) <= 75:
+        return line
+    
+    parts = []
+    current = ''
+    size = 0
+    for char in line:
+        char_size = len(char.encode())
+        if size + char_size > 75:
+            parts.append(current)
+            # Continuation lines start with a single space
+            current = ' '
+            size = 1
+        current += char
+        size += char_size
+    parts.append(current)
+    return '\n'.join(parts)
+
+def _format_duration(delta: timedelta) -> str:
+    """Format a timedelta as an iCalendar DURATION value, e.g. -PT5M"""
+    seconds = int(delta.total_seconds())
+    sign = '-' if seconds < 0 else ''
+    minutes, remainder = divmod(abs(seconds), 60)
+    if minutes and not remainder:
+        return f'{sign}PT{minutes}M'
+    return f'{sign}PT{abs(seconds)}S'
+
 class CalendarGenerator:
     """Handles generation of .ics calendar files"""
-    def __init__(self, prayer_data: Dict[str, Any], city: str, emirate: str):
+    DATETIME_FORMAT = '%Y%m%dT%H%M%S'
+    
+    def __init__(self, prayer_data: Dict[str, Any], city: str, emirate: str, force: bool = False):
         self.prayer_data = prayer_data
         self.city = city
         self.emirate = emirate
-        self.first_date = datetime.strptime(prayer_data["prayertimes"][0]["date"], "%Y-%m-%d")
-    
-    def _create_base_calendar(self) -> Calendar:
-        """Create a base calendar with common properties"""
-        cal = Calendar()
-        cal.add('prodid', '-//Prayer Times Calendar Generator//EN')
-        cal.add('version', '2.0')
-        cal.add('calscale', 'GREGORIAN')
-        cal.add('method', 'PUBLISH')
-        cal.add('x-wr-calname', f'{self.city} Prayer Times')
-        cal.add('x-wr-timezone', PrayerConfig.TIMEZONE)
-        return cal
-    
-    def _create_event_uid(self, event_str: str) -> str:
-        """Generate a unique identifier for calendar events"""
-        return hashlib.md5(event_str.encode()).hexdigest()
-    
-    def _create_alarm(self, description: str, trigger: timedelta) -> Alarm:
-        """Create an alarm component for events"""
-        alarm = Alarm()
-        alarm.add('action', 'DISPLAY')
-        alarm.add('description', description)
-        alarm.add('trigger', trigger)
-        return alarm
-    
-    def _create_adhan_event(self, date: str, prayer: str, time: str) -> Event:
-        """Create an Adhan event"""
-        event_dt = self._parse_datetime(f"{date} {time}")
-        
-        event = Event()
-        event_str = f"{date}_{prayer}_adhan_{self.city}"
-        event['uid'] = self._create_event_uid(event_str)
-        
-        # Set event times
-        duration = PrayerConfig.ADHAN_DURATIONS[prayer]
-        event.add('dtstart', event_dt)
-        event.add('dtend', event_dt + timedelta(minutes=duration))
-        
-        # Set event properties
-        event.add('summary', f'{prayer.title()} Adhan till Iqamah')
-        event.add('description', f'{prayer.title()} Adhan Time for {self.city}')
-        event.add('location', self.city)
-        event.add('color', PrayerConfig.ADHAN_COLOR)
-        
-        # Add notification
-        alarm = self._create_alarm(f'{prayer.title()} Adhan', timedelta(minutes=0))
-        event.add_component(alarm)
+        self.force = force
+        self.first_date = date.fromisoformat(prayer_data["prayertimes"][0]["date"])
+        
+        # Output paths and daily files are keyed by the first date's month and the day number,
+        # so data spanning several months would be misfiled or overwrite same-numbered days
+        months = {day_data["date"][:7] for day_data in prayer_data["prayertimes"]}
+        if len(months) > 1:
+            raise ValueError(
+                f"Prayer times must cover a single month to generate calendars, got data for: {', '.join(sorted(months))}"
+            )
         
-        return event
+        self._city_enc = city.encode()
+        location_line = _fold_line(f'LOCATION:{_escape_text(city)}')
+        
+        # Everything except the UID and times depends only on the prayer and event kind,
+        # so build each (prayer, kind) template once: start/end offsets from the Adhan
+        # time, UID key suffix, and the remaining event lines including its alarm
+        self._event_parts = {}
+        for prayer, meta in PrayerConfig.PRAYERS.items():
+            adhan_end = timedelta(minutes=meta['adhan_duration'])
+            offsets = {
+                'adhan': (timedelta(0), adhan_end),
+                'prayer': (adhan_end, adhan_end + timedelta(minutes=PrayerConfig.PRAYER_DURATION))
+            }
+            for kind, spec in _EVENT_SPECS.items():
+                description = f"{meta['title']} {spec['description']} {city}"
+                body = (
+                    f"SUMMARY:{_escape_text(meta[spec['summary']])}\n"
+                    f"{_fold_line('DESCRIPTION:' + _escape_text(description))}\n"
+                    f'{location_line}\n'
+                    f"COLOR:{spec['color']}\n"
+                    f"{self._create_alarm(meta[spec['alarm']], spec['alarm_trigger'])}"
+                    'END:VEVENT\n'
+                )
+                start_offset, end_offset = offsets[kind]
+                self._event_parts[(prayer, kind)] = (start_offset, end_offset, f'{prayer}_{kind}_', body)
+        
+        self._source_hash = self._compute_source_hash()
     
-    def _create_prayer_event(self, date: str, prayer: str, time: str, adhan_duration: int) -> Event:
-        """Create a Prayer event"""
-        event_dt = self._parse_datetime(f"{date} {time}")
-        prayer_start = event_dt + timedelta(minutes=adhan_duration)
-        
-        event = Event()
-        event_str = f"{date}_{prayer}_prayer_{self.city}"
-        event['uid'] = self._create_event_uid(event_str)
-        
-        # Set event times
-        event.add('dtstart', prayer_start)
-        event.add('dtend', prayer_start + timedelta(minutes=PrayerConfig.PRAYER_DURATION))
-        
-        # Set event properties
-        event.add('summary', f'{prayer.title()} Prayer')
-        event.add('description', f'{prayer.title()} Prayer Time for {self.city}')
-        event.add('location', self.city)
-        event.add('color', PrayerConfig.PRAYER_COLOR)
-        
-        # Add notification
-        alarm = self._create_alarm(f'{prayer.title()} Prayer in 5 minutes', timedelta(minutes=-5))
-        event.add_component(alarm)
-        
-        return event
+    def _compute_source_hash(self) -> str:
+        """
+        Hash what the calendar is rendered from: the API data, the calendar header and the
+        (prayer, kind) event templates. Settings such as the timezone, durations, colours and
+        event wording all end up in the header or templates, so they are covered too.
+        """
+        event_templates = [
+            [prayer, kind, start_offset.total_seconds(), end_offset.total_seconds(), uid_suffix, body]
+            for (prayer, kind), (start_offset, end_offset, uid_suffix, body) in self._event_parts.items()
+        ]
+        source = orjson.dumps([
+            self.prayer_data,
+            self._create_base_calendar(),
+            event_templates
+        ], option=orjson.OPT_SORT_KEYS)
+        return hashlib.blake2b(source, digest_size=16).hexdigest()
+    
+    def _is_up_to_date(self, filepath: str) -> bool:
+        """Check whether a calendar file was already generated from the same source data"""
+        if self.force:
+            return False
+        try:
+            with open(filepath + '.hash', 'r') as f:
+                return f.read().strip() == self._source_hash and os.path.exists(filepath)
+        except FileNotFoundError:
+            return False
+    
+    def _create_base_calendar(self) -> str:
+        """Create the calendar header with common properties"""
+        lines = [
+            'BEGIN:VCALENDAR',
+            'PRODID:-//Prayer Times Calendar Generator//EN',
+            'VERSION:2.0',
+            'CALSCALE:GREGORIAN',
+            'METHOD:PUBLISH',
+            f'X-WR-CALNAME:{_escape_text(self.city)} Prayer Times',
+            f'X-WR-TIMEZONE:{PrayerConfig.TIMEZONE}'
+        ]
+        return ''.join(_fold_line(line) + '\n' for line in lines)
+    
+    def _create_event_uid(self, event_key: str) -> str:
+        """Generate a unique identifier for calendar events from a key ending in '_'"""
+        return hashlib.blake2b(event_key.encode() + self._city_enc, digest_size=16).hexdigest()
+    
+    def _create_alarm(self, description: str, trigger: timedelta) -> str:
+        """Create an alarm component for events"""
+        return (
+            'BEGIN:VALARM\n'
+            'ACTION:DISPLAY\n'
+            f'{_fold_line("DESCRIPTION:" + _escape_text(description))}\n'
+            f'TRIGGER:{_format_duration(trigger)}\n'
+            'END:VALARM\n'
+        )
+    
+    def _create_event(self, kind: str, adhan_dt: datetime, day_uid_prefix: str, prayer: str) -> str:
+        """Create an Adhan or Prayer event from its prebuilt (prayer, kind) template"""
+        start_offset, end_offset, uid_suffix, body = self._event_parts[(prayer, kind)]
+        
+        return (
+            'BEGIN:VEVENT\n'
+            f'UID:{self._create_event_uid(day_uid_prefix + uid_suffix)}\n'
+            f'DTSTART;TZID={PrayerConfig.TIMEZONE}:{(adhan_dt + start_offset).strftime(self.DATETIME_FORMAT)}\n'
+            f'DTEND;TZID={PrayerConfig.TIMEZONE}:{(adhan_dt + end_offset).strftime(self.DATETIME_FORMAT)}\n'
+            f'{body}'
+        )
     
-    def _parse_datetime(self, time_str: str) -> datetime:
-        """Parse prayer time string into datetime object"""
-        return datetime.fromisoformat(time_str).replace(tzinfo=pytz.timezone(PrayerConfig.TIMEZONE))
+    def _event_datetime(self, day_date: date, hour: int, minute: int) -> datetime:
+        """Build a timezone-aware datetime from a pre-parsed date and prayer time"""
+        return datetime(day_date.year, day_date.month, day_date.day, hour, minute, tzinfo=_TZ)
     
     def _get_output_path(self, day: Optional[int] = None) -> Tuple[str, str]:
         """Get output directory and filename for calendar file"""
@@ -481,61 +626,120 @@ class CalendarGenerator:
         else:
             # Monthly calendar
             output_dir = base_dir
-            last_day = self.prayer_data["prayertimes"][-1]["date"]
-            first_day_num = self.first_date.day
-            last_day_num = datetime.strptime(last_day, "%Y-%m-%d").day
             filename = f"{month_name}{year}.ics"
         
         return output_dir, filename
     
-    def generate(self, day: Optional[int] = None) -> str:
+    def generate(self, day: Optional[int] = None) -> Tuple[str, bool]:
         """
         Generate .ics calendar file
         Args:
             day: Optional specific day to generate calendar for
         Returns:
-            Path to generated calendar file
+            Path to the calendar file, and whether it was written (False if it was already up to date)
         """
-        cal = self._create_base_calendar()
+        events = (event for _, day_events in self._iter_day_events(day) for event in day_events)
+        return self._write_calendar(events, day)
+    
+    def generate_all(self) -> Tuple[List[str], bool]:
+        """
+        Generate the full calendar file plus one .ics file per day, building each event only once
+        Returns:
+            Paths to the calendar files, full calendar first, and whether any file was written
+            (False if all of them were already up to date)
+        """
+        # Skip building any events when every file is already current
+        filepaths = [os.path.join(*self._get_output_path())]
+        for day_data in self.prayer_data["prayertimes"]:
+            filepaths.append(os.path.join(*self._get_output_path(date.fromisoformat(day_data["date"]).day)))
+        if all(self._is_up_to_date(filepath) for filepath in filepaths):
+            logger.debug("Skipping %d calendar files; source data unchanged", len(filepaths))
+            return filepaths, False
+        
+        day_events = list(self._iter_day_events())
         
+        results = [self._write_calendar(
+            (event for _, events in day_events for event in events)
+        )]
+        for day_date, events in day_events:
+            results.append(self._write_calendar(events, day_date.day))
+        
+        return [filepath for filepath, _ in results], any(written for _, written in results)
+    
+    def _write_calendar(self, events: Iterable[str], day: Optional[int] = None) -> Tuple[str, bool]:
+        """
+        Write a calendar file containing the given VEVENT blocks and return its path and
+        whether it was written. The file is left untouched, and events are never consumed,
+        if its .hash sidecar shows it was generated from the same source data.
+        """
+        output_dir, filename = self._get_output_path(day)
+        filepath = os.path.join(output_dir, filename)
+        if self._is_up_to_date(filepath):
+            logger.debug("Skipping %s; source data unchanged", filepath)
+            return filepath, False
+        
+        os.makedirs(output_dir, exist_ok=True)
+        hash_path = filepath + '.hash'
+        temp_path = filepath + '.tmp'
+        
+        # Drop the old sidecar first so an interrupted rewrite can never look up to date
+        try:
+            os.remove(hash_path)
+        except FileNotFoundError:
+            pass
+        
+        # Stream the calendar to a temporary file and move it into place once complete, so
+        # the previous calendar survives a failed write; newline='\r\n' gives the CRLF line
+        # endings iCalendar requires
+        try:
+            with open(temp_path, 'w', encoding='utf-8', newline='\r\n') as f:
+                f.write(self._create_base_calendar())
+                f.writelines(events)
+                f.write('END:VCALENDAR\n')
+            os.replace(temp_path, filepath)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        
+        # Record the source hash only once the calendar itself is in place
+        with open(hash_path, 'w') as f:
+            f.write(self._source_hash)
+        
+        return filepath, True
+    
+    def _iter_day_events(self, day: Optional[int] = None) -> Iterator[Tuple[date, List[str]]]:
+        """Yield each day's date with its Adhan and Prayer VEVENT blocks"""
         # Process each day's prayer times
         for day_data in self.prayer_data["prayertimes"]:
-            date = day_data["date"]
+            # Parse the date and build its UID prefix once per day rather than once per event
+            day_date = date.fromisoformat(day_data["date"])
+            day_uid_prefix = day_data["date"] + '_'
             
             # If specific day is requested, skip other days
-            if day:
-                current_day = datetime.strptime(date, "%Y-%m-%d").day
-                if current_day != day:
-                    continue
+            if day and day_date.day != day:
+                continue
+            
+            events = []
             
             # Process each prayer
-            for prayer in ["fajr", "zuhr", "asr", "maghrib", "isha"]:
-                time = day_data["timings"][prayer]
-                if not time:  # Skip if no time available
+            for prayer in _PRAYER_ORDER:
+                prayer_time = day_data["timings"][prayer]
+                if not prayer_time:  # Skip if no time available
                     continue
                 
                 try:
-                    # Create Adhan event
-                    adhan_event = self._create_adhan_event(date, prayer, time)
-                    cal.add_component(adhan_event)
+                    adhan_dt = self._event_datetime(day_date, int(prayer_time[:2]), int(prayer_time[3:5]))
                     
-                    # Create Prayer event
-                    prayer_event = self._create_prayer_event(date, prayer, time, PrayerConfig.ADHAN_DURATIONS[prayer])
-                    cal.add_component(prayer_event)
+                    # Create Adhan and Prayer events
+                    for kind in _EVENT_SPECS:
+                        events.append(self._create_event(kind, adhan_dt, day_uid_prefix, prayer))
                     
                 except Exception as e:
-                    print(f"Error creating events for {date} {prayer}: {str(e)}")
+                    logger.warning("Error creating events for %s %s: %s", day_date, prayer, e)
                     continue
-        
-        # Save calendar to file
-        output_dir, filename = self._get_output_path(day)
-        os.makedirs(output_dir, exist_ok=True)
-        filepath = os.path.join(output_dir, filename)
-        
-        with open(filepath, 'wb') as f:
-            f.write(cal.to_ical())
-        
-        return filepath
+            
+            yield day_date, events
 
 def print_help():
     """Print help information about the script"""
@@ -551,8 +755,11 @@ Options:
     --year YEAR         Year (default: 2025)
     --month MONTH       Month number (1-12)
     --day DAY           Optional: Generate calendar for specific day only
+    --daily             Optional: Also generate a calendar for each day of the month
     --list-emirates    List all emirates
     --list-cities      List all cities for the specified emirate
+    --force            Regenerate calendar files even if the source data is unchanged
+    --verbose          Show debug logging
     --show-help        Show this help message
 
 Examples:
@@ -562,6 +769,9 @@ Examples:
     # Generate daily calendar for Dubai, January 15, 2025
     python prayer-times-ics-generator.py --city Dubai --emirate Dubai --year 2025 --month 1 --day 15
     
+    # Generate the monthly calendar and every daily calendar for January 2025 in one go
+    python prayer-times-ics-generator.py --city Dubai --emirate Dubai --year 2025 --month 1 --daily
+    
     # List all emirates
     python prayer-times-ics-generator.py --list-emirates
     
@@ -599,12 +809,23 @@ def main():
     parser.add_argument('--year', type=int, default=2025, help='Year')
     parser.add_argument('--month', type=int, default=1, help='Month')
     parser.add_argument('--day', type=int, help='Optional: Specific day to generate calendar for')
+    parser.add_argument('--daily', action='store_true', help='Also generate a calendar file for each day of the month')
     parser.add_argument('--list-emirates', action='store_true', help='List all emirates')
     parser.add_argument('--list-cities', action='store_true', help='List all cities for the specified emirate')
     parser.add_argument('--show-help', action='store_true', help='Show detailed help message')
+    parser.add_argument('--force', action='store_true', help='Regenerate calendar files even if the source data is unchanged')
+    parser.add_argument('--verbose', action='store_true', help='Show debug logging')
     
     args = parser.parse_args()
     
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.WARNING,
+        format='%(levelname)s: %(message)s'
+    )
+    
+    # Release pooled connections once the script is done with the API
+    atexit.register(TokenManager._session.close)
+    
     if args.show_help:
         print_help()
         return
@@ -633,14 +854,35 @@ def main():
     
     try:
         # Fetch prayer times from API
-        prayer_data = AWQAFApi.fetch_prayer_times(args.year, args.month, args.day, args.city)
+        if args.day:
+            # If day is specified, fetch only that day
+            start_date = end_date = date(args.year, args.month, args.day)
+        else:
+            # Fetch the whole month in one request
+            _, last_day = _monthrange(args.year, args.month)
+            start_date = date(args.year, args.month, 1)
+            end_date = date(args.year, args.month, last_day)
+        prayer_data = AWQAFApi.fetch_prayer_times(start_date, end_date, args.city)
         
         # Generate calendar file
-        generator = CalendarGenerator(prayer_data, args.city, args.emirate)
-        filepath = generator.generate(args.day)
-        
-        print(f"\nSuccessfully generated prayer time calendar file!")
-        print(f"File is located at: {filepath}")
+        generator = CalendarGenerator(prayer_data, args.city, args.emirate, force=args.force)
+        if args.daily and not args.day:
+            # Monthly and daily files share a single fetch and event build
+            filepaths, written = generator.generate_all()
+            if written:
+                print(f"\nSuccessfully generated {len(filepaths)} prayer time calendar files!")
+            else:
+                print("\nPrayer time calendar files are up to date, not regenerated (use --force to rebuild).")
+            print(f"Monthly file is located at: {filepaths[0]}")
+            if len(filepaths) > 1:
+                print(f"Daily files are located in: {os.path.dirname(filepaths[1])}")
+        else:
+            filepath, written = generator.generate(args.day)
+            if written:
+                print("\nSuccessfully generated prayer time calendar file!")
+            else:
+                print("\nPrayer time calendar file is up to date, not regenerated (use --force to rebuild).")
+            print(f"File is located at: {filepath}")
     except json.JSONDecodeError as e:
         print(f"JSON parsing error: {str(e)}")
         print(f"File path: {e.doc}")